@@ -3,14 +3,205 @@ This module implements the Gibbs sampling algorithm for a Dirichlet Mixture Mode
 of Yin and Wang 2014 for the clustering of short text documents.
 """
 
+import heapq
+import math
 from typing import Any, Dict
-from numpy.random import multinomial
-from numpy import argmax, log, exp, array as np_array
+import numpy as np
+
+try:
+    from numba import njit, prange
+
+    _HAS_NUMBA = True
+except ImportError:  # pragma: no cover
+    prange = range
+    _HAS_NUMBA = False
+
+try:
+    import cupy
+except ImportError:  # pragma: no cover
+    cupy = None
 
 
 TopicWords = Dict[Any, str]
 
 
+# number of documents _block_sweep samples together on the GPU
+_GPU_BLOCK_SIZE = 4096
+
+
+def _array_module(arr):
+    """
+    The array module (numpy or cupy) that arr belongs to
+    """
+    return np if cupy is None else cupy.get_array_module(arr)
+
+
+def _to_numpy(arr):
+    """
+    Copy arr to host memory if it lives on the GPU
+    """
+    return arr if cupy is None else cupy.asnumpy(arr)
+
+
+def _gibbs_sweep(  # pylint: disable=invalid-name,too-many-arguments,too-many-locals
+    d_z,
+    docs_flat,
+    doc_offsets,
+    token_mult,
+    m_z,
+    n_z,
+    n_z_w,
+    alpha,
+    beta,
+    K,
+    D,
+    log_denom_cum,
+    rand_uniforms,
+    skip_threshold,
+    doc_confidence,
+    doc_version,
+    cluster_version,
+):
+    """
+    Run one Gibbs sampling pass over all documents, updating the cluster state in place.
+    Compiled with numba when it is installed. The parallel build visits documents
+    concurrently and updates the shared counts without locks (Hogwild), so call
+    _recount afterwards to repair any lost updates.
+
+    :param d_z: np.ndarray[int]: cluster label of each document
+    :param docs_flat: np.ndarray[int32]: token ids of all documents, concatenated
+    :param doc_offsets: np.ndarray[int64]: doc i spans docs_flat[doc_offsets[i]:doc_offsets[i+1]]
+    :param token_mult: np.ndarray[int32]: for each entry of docs_flat, how often that
+                                          token occurs in its doc, see _token_multiplicity
+    :param log_denom_cum: np.ndarray[float]: prefix sums of log(V*beta + j), see _log_denom_cum
+    :param rand_uniforms: np.ndarray[float]: one uniform draw in [0, 1) per document
+    :param skip_threshold: float: see MovieGroupProcess; np.inf never skips a document
+    :param doc_confidence: np.ndarray[float]: probability each doc's cluster had when
+                                              the doc was last sampled
+    :param doc_version: np.ndarray[int64]: cluster_version of each doc's cluster right
+                                           after the doc was last sampled
+    :param cluster_version: np.ndarray[int64]: bumped whenever a doc transfers in or out
+    :return: int
+        number of documents transferred to a different cluster
+    """
+    total_transfers = 0
+    for i in prange(D):  # pylint: disable=not-an-iterable
+        z_old = d_z[i]
+
+        # keep the doc where it is if it was confidently placed and its cluster
+        # has not changed since
+        if (
+            doc_confidence[i] >= skip_threshold
+            and doc_version[i] == cluster_version[z_old]
+        ):
+            continue
+
+        p = np.empty(K)
+        start, end = doc_offsets[i], doc_offsets[i + 1]
+        doc = docs_flat[start:end]
+        mult = token_mult[start:end]
+        doc_size = doc.shape[0]
+
+        # score every cluster in log space; log(D - 1 + K*alpha) is shared by all
+        # clusters and cancels in the normalization, so it is left out. The doc is
+        # not physically removed from z_old: its own contribution is subtracted
+        # from the counts as they are read, so a doc that stays put costs no writes.
+        # Counts are clamped at zero since Hogwild updates can briefly drive them
+        # negative.
+        lp_max = -np.inf
+        n_max = log_denom_cum.shape[0] - 1 - doc_size
+        for z in range(K):
+            own = 1 if z == z_old else 0
+            n = min(max(n_z[z] - own * doc_size, 0), n_max)
+            lp = math.log(max(m_z[z] - own, 0) + alpha)
+            lp -= log_denom_cum[n + doc_size] - log_denom_cum[n]
+            for j in range(doc_size):
+                lp += math.log(max(n_z_w[z, doc[j]] - own * mult[j], 0) + beta)
+            p[z] = lp
+            lp_max = max(lp_max, lp)
+
+        # draw the new cluster by inverting the cumulative distribution
+        total = 0.0
+        for z in range(K):
+            p[z] = math.exp(p[z] - lp_max)
+            total += p[z]
+        threshold = rand_uniforms[i] * total
+        z_new = K - 1
+        cumulative = 0.0
+        for z in range(K):
+            cumulative += p[z]
+            if threshold < cumulative:
+                z_new = z
+                break
+
+        # transfer doc to the new cluster in a single pass over its tokens; only a
+        # transfer changes cluster contents
+        if z_new != z_old:
+            total_transfers += 1
+            cluster_version[z_old] += 1
+            cluster_version[z_new] += 1
+
+            d_z[i] = z_new
+            m_z[z_old] -= 1
+            m_z[z_new] += 1
+            n_z[z_old] -= doc_size
+            n_z[z_new] += doc_size
+            for w in doc:
+                n_z_w[z_old, w] -= 1
+                n_z_w[z_new, w] += 1
+        doc_confidence[i] = p[z_new] / total
+        doc_version[i] = cluster_version[z_new]
+
+    return total_transfers
+
+
+def _log_denom_cum(V, beta, size):  # pylint: disable=invalid-name
+    """
+    Prefix sums of log(V*beta + j) for j = 0..size-1, so that the denominator
+    sum(log(n + V*beta + j) for j in range(doc_size)) of a cluster holding n words
+    is log_denom_cum[n + doc_size] - log_denom_cum[n]. This is the tabulated form
+    of lgamma(n + V*beta + doc_size) - lgamma(n + V*beta), and is cheaper to look up
+    in the sweep than two lgamma calls.
+    """
+    log_denom_cum = np.zeros(size + 1)
+    np.cumsum(np.log(V * beta + np.arange(size)), out=log_denom_cum[1:])
+    return log_denom_cum
+
+
+def _recount(d_z, docs_flat, doc_offsets, m_z, n_z, n_z_w):
+    """
+    Recompute the cluster counts in place from the document labels d_z
+    """
+    doc_sizes = np.diff(doc_offsets)
+    K, V = n_z_w.shape  # pylint: disable=invalid-name
+    m_z[:] = np.bincount(d_z, minlength=K)
+    n_z[:] = np.bincount(d_z, weights=doc_sizes, minlength=K)
+
+    # bincount over flat (cluster, word) indices folds repeated tokens in one pass
+    cells = np.repeat(d_z.astype(np.int64), doc_sizes) * V + docs_flat
+    n_z_w[:] = np.bincount(cells, minlength=K * V).reshape(K, V)
+
+
+def _token_multiplicity(docs_flat, doc_offsets):
+    """
+    For each entry of docs_flat, the number of times that token occurs in its doc
+    """
+    doc_sizes = np.diff(doc_offsets)
+    n_ids = docs_flat.max(initial=0) + 1
+    keys = np.repeat(np.arange(len(doc_sizes)), doc_sizes) * n_ids + docs_flat
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    return counts[inverse].astype(np.int32)
+
+
+_gibbs_sweep_parallel = None
+if _HAS_NUMBA:
+    # numba keys its on-disk cache by the Python function alone, not the compile
+    # options, so caching both builds of _gibbs_sweep would let one be served
+    # for the other; only the default sequential build is cached
+    _gibbs_sweep_parallel = njit(parallel=True)(_gibbs_sweep)
+    _gibbs_sweep = njit(cache=True)(_gibbs_sweep)
+
+
 class MovieGroupProcess:
     """
     This class implements the Gibbs sampling algorithm for a Dirichlet Mixture Model (GSDMM)
@@ -18,7 +209,17 @@ class MovieGroupProcess:
     """
 
     # pylint: disable=invalid-name,too-many-instance-attributes
-    def __init__(self, K=8, alpha=0.1, beta=0.1, n_iters=30):
+    def __init__(
+        self,
+        K=8,
+        alpha=0.1,
+        beta=0.1,
+        n_iters=30,
+        random_state=None,
+        parallel=False,
+        use_gpu=False,
+        skip_threshold=None,
+    ):  # pylint: disable=too-many-arguments
         """
         A MovieGroupProcess is a conceptual model introduced by Yin and Wang 2014 to
         describe their Gibbs sampling algorithm for a Dirichlet Mixture Model for the
@@ -45,17 +246,44 @@ class MovieGroupProcess:
             by the popularity of a table.
         :param n_iters:
             Number of iterations to resolve cluster definitions.
+        :param random_state: int, np.random.Generator or None
+            Seed or generator used for all sampling, for reproducible fits.
+        :param parallel: bool
+            Sample documents on all cores at once, sharing the cluster counts without
+            locks (Hogwild). This approximates the sequential Gibbs sampler and is
+            not reproducible across runs. Requires numba.
+        :param use_gpu: bool
+            Run fit on the GPU. Documents are sampled in blocks of _GPU_BLOCK_SIZE
+            against the counts as they stood at the start of the block, which
+            approximates the sequential Gibbs sampler. Requires cupy.
+        :param skip_threshold: float between 0 and 1 or None
+            When set, a student whose table had at least this probability at their
+            last turn, and whose table nobody has joined or left since, keeps their
+            seat without being rescored. This speeds up late iterations at the cost
+            of no longer being an exact Gibbs sampler. None rescores everyone.
         """
         self.K = K  # pylint: disable=invalid-name
         self.alpha = alpha
         self.beta = beta
         self.n_iters = n_iters
+        self._rng = np.random.default_rng(random_state)
+        if parallel and not _HAS_NUMBA:
+            raise ImportError("parallel=True requires numba to be installed")
+        self.parallel = parallel
+        if use_gpu and cupy is None:
+            raise ImportError("use_gpu=True requires cupy to be installed")
+        if use_gpu and parallel:
+            raise ValueError("parallel and use_gpu cannot be combined")
+        self.use_gpu = use_gpu
+        if skip_threshold is not None and not 0 < skip_threshold <= 1:
+            raise ValueError("skip_threshold must be in (0, 1] or None")
+        self.skip_threshold = skip_threshold
 
         # slots for computed variables
         self.number_docs = None
         self.vocab_size = None
-        self.cluster_doc_count = [0 for _ in range(K)]
-        self.cluster_word_count = [0 for _ in range(K)]
+        self.cluster_doc_count = np.zeros(K, dtype=np.int32)
+        self.cluster_word_count = np.zeros(K, dtype=np.int64)
         self.cluster_word_distribution = [{} for i in range(K)]
 
     # pylint: disable=invalid-name,too-many-arguments
@@ -91,15 +319,20 @@ class MovieGroupProcess:
         return mgp
 
     @staticmethod
-    def _sample(p):
+    def _sample(p, u):
         """
         Sample with probability vector p from a multinomial distribution
-        :param p: list
-            List of probabilities representing probability vector for the multinomial distribution
+        :param p: np.ndarray
+            Probability vector for the multinomial distribution
+        :param u: float
+            Uniform draw in [0, 1) that selects the output by inverting the cumulative
+            distribution
         :return: int
             index of randomly selected output
         """
-        return [i for i, entry in enumerate(multinomial(1, p)) if entry != 0][0]
+        cumulative = np.cumsum(p)
+        z = int((cumulative <= u * cumulative[-1]).sum())
+        return min(z, len(p) - 1)
 
     def fit(self, docs, vocab_size):
         """
@@ -107,11 +340,11 @@ class MovieGroupProcess:
         :param docs: list of list
             list of lists containing the unique token set of each document
         :param V: total vocabulary size for each document
-        :return: list of length len(doc)
+        :return: np.ndarray[int32] of length len(docs)
             cluster label for each document
         """
         # pylint: disable=invalid-name,too-many-locals
-        _, __, K, n_iters, ___ = (
+        alpha, beta, K, n_iters, V = (
             self.alpha,
             self.beta,
             self.K,
@@ -123,65 +356,105 @@ class MovieGroupProcess:
         self.number_docs = D
         self.vocab_size = vocab_size
 
-        # unpack to easy var names
-        m_z, n_z, n_z_w = (
-            self.cluster_doc_count,
-            self.cluster_word_count,
-            self.cluster_word_distribution,
+        # encode tokens as integer ids so word counts live in a dense (K, V) matrix,
+        # and flatten the docs into a CSR-like layout: doc i spans
+        # docs_flat[doc_offsets[i]:doc_offsets[i + 1]]. setdefault assigns and looks
+        # up each id with a single dict access.
+        token2id = {}
+        docs_flat = np.array(
+            [token2id.setdefault(word, len(token2id)) for doc in docs for word in doc],
+            dtype=np.int32,
         )
-        cluster_count = K
-        d_z = [None for i in range(len(docs))]
-
-        # initialize the clusters
-        for i, doc in enumerate(docs):
-
-            # choose a random  initial cluster for the doc
-            z = self._sample([1.0 / K for _ in range(K)])
-            d_z[i] = z
-            m_z[z] += 1
-            n_z[z] += len(doc)
+        doc_offsets = np.zeros(D + 1, dtype=np.int64)
+        doc_offsets[1:] = np.cumsum([len(doc) for doc in docs])
 
-            for word in doc:
-                if word not in n_z_w[z]:
-                    n_z_w[z][word] = 0
-                n_z_w[z][word] += 1
+        # unpack to easy var names
+        m_z = self.cluster_doc_count = np.zeros(K, dtype=np.int32)
+        n_z = self.cluster_word_count = np.zeros(K, dtype=np.int64)
+        n_z_w = np.zeros((K, len(token2id)), dtype=np.int32)
+        cluster_count = K
+        d_z = np.full(D, -1, dtype=np.int32)
+
+        # initialize the clusters: choose a random initial cluster for each doc,
+        # then count all docs into their clusters at once
+        d_z[:] = np.minimum(self._rng.random(D) * K, K - 1).astype(np.int32)
+        _recount(d_z, docs_flat, doc_offsets, m_z, n_z, n_z_w)
+
+        # the per-cluster denominator only depends on the cluster word count, which
+        # never exceeds the corpus size, so tabulate it once for the whole fit
+        doc_sizes = np.diff(doc_offsets)
+        log_denom_cum = _log_denom_cum(
+            V, beta, doc_offsets[-1] + (doc_sizes.max() if D else 0)
+        )
+        sweep = _gibbs_sweep_parallel if self.parallel else _gibbs_sweep
+        use_numba = _HAS_NUMBA and not self.use_gpu
+        token_mult = _token_multiplicity(docs_flat, doc_offsets)
+        repeated_tokens = bool(token_mult.max(initial=0) > 1)
+        # per-doc confidence and version stamps used to skip settled documents
+        skip_state = (
+            np.zeros(D),
+            np.zeros(D, dtype=np.int64),
+            np.zeros(K, dtype=np.int64),
+        )
+        if self.use_gpu:
+            # move the sweep state to the device for _block_sweep
+            d_z = cupy.asarray(d_z)
+            skip_state = tuple(cupy.asarray(arr) for arr in skip_state)
+            m_z = self.cluster_doc_count = cupy.asarray(m_z)
+            n_z = self.cluster_word_count = cupy.asarray(n_z)
+            n_z_w = cupy.asarray(n_z_w)
+            docs_flat = cupy.asarray(docs_flat)
+            token_mult = cupy.asarray(token_mult)
+            log_denom_cum = cupy.asarray(log_denom_cum)
 
         for _iter in range(n_iters):
-            total_transfers = 0
-
-            for i, doc in enumerate(docs):
-
-                # remove the doc from it's current cluster
-                z_old = d_z[i]
-
-                m_z[z_old] -= 1
-                n_z[z_old] -= len(doc)
-
-                for word in doc:
-                    n_z_w[z_old][word] -= 1
-
-                    # compact dictionary to save space
-                    if n_z_w[z_old][word] == 0:
-                        del n_z_w[z_old][word]
-
-                # draw sample from distribution to find new cluster
-                p = self.score(doc)
-                z_new = self._sample(p)
-
-                # transfer doc to the new cluster
-                if z_new != z_old:
-                    total_transfers += 1
-
-                d_z[i] = z_new
-                m_z[z_new] += 1
-                n_z[z_new] += len(doc)
-
-                for word in doc:
-                    if word not in n_z_w[z_new]:
-                        n_z_w[z_new][word] = 0
-                    n_z_w[z_new][word] += 1
-
-            cluster_count_new = sum(v > 0 for v in m_z)
+            # draw the uniforms for every document's sample up front in one call
+            rand_uniforms = self._rng.random(D)
+            if use_numba:
+                total_transfers = sweep(
+                    d_z,
+                    docs_flat,
+                    doc_offsets,
+                    token_mult,
+                    m_z,
+                    n_z,
+                    n_z_w,
+                    alpha,
+                    beta,
+                    K,
+                    D,
+                    log_denom_cum,
+                    rand_uniforms,
+                    self._skip_threshold(),
+                    *skip_state,
+                )
+                if self.parallel:
+                    _recount(d_z, docs_flat, doc_offsets, m_z, n_z, n_z_w)
+            elif self.use_gpu:
+                total_transfers = self._block_sweep(
+                    d_z,
+                    docs_flat,
+                    doc_offsets,
+                    token_mult,
+                    n_z_w,
+                    log_denom_cum,
+                    cupy.asarray(rand_uniforms),
+                    skip_state,
+                )
+            else:
+                total_transfers = self._sweep(
+                    d_z,
+                    docs_flat,
+                    doc_offsets,
+                    token_mult,
+                    n_z_w,
+                    log_denom_cum,
+                    repeated_tokens,
+                    rand_uniforms,
+                    skip_state,
+                )
+
+            cluster_count_new = int(_array_module(m_z).count_nonzero(m_z))
             print(
                 f"In stage {_iter}: transferred {total_transfers} clusters "
                 f"with {cluster_count_new} clusters populated"
@@ -194,10 +467,226 @@ class MovieGroupProcess:
                 print("Converged.  Breaking out.")
                 break
             cluster_count = cluster_count_new
-        self.cluster_word_distribution = n_z_w
+
+        # decode the dense counts back to sparse per-cluster token dictionaries; zero
+        # counts are dropped here once rather than deleted on every removal
+        d_z = _to_numpy(d_z)
+        self.cluster_doc_count = _to_numpy(m_z)
+        self.cluster_word_count = _to_numpy(n_z)
+        n_z_w = _to_numpy(n_z_w)
+        id2token = list(token2id)
+        self.cluster_word_distribution = []
+        for row in n_z_w:
+            nonzero = np.flatnonzero(row)
+            self.cluster_word_distribution.append(
+                dict(zip([id2token[w] for w in nonzero], row[nonzero].tolist()))
+            )
         return d_z
 
-    def score(self, doc):  # pylint: disable=too-many-locals
+    def _sweep(
+        self,
+        d_z,
+        docs_flat,
+        doc_offsets,
+        token_mult,
+        n_z_w,
+        log_denom_cum,
+        repeated_tokens,
+        rand_uniforms,
+        skip_state,
+    ):  # pylint: disable=too-many-arguments,too-many-locals
+        """
+        Run one Gibbs sampling pass over all documents with NumPy, used when numba
+        is not installed
+        :param d_z: np.ndarray[int]: cluster label of each document, updated in place
+        :param docs_flat: np.ndarray[int32]: token ids of all documents, concatenated
+        :param doc_offsets: np.ndarray[int64]: doc i spans docs_flat[doc_offsets[i]:doc_offsets[i+1]]
+        :param token_mult: np.ndarray[int32]: multiplicity of each docs_flat entry in its doc
+        :param n_z_w: np.ndarray[int32]: (K, V) cluster word counts, updated in place
+        :param log_denom_cum: np.ndarray[float]: prefix sums of log(V*beta + j)
+        :param repeated_tokens: bool: whether some doc holds a token more than once, in
+                                      which case the count updates must accumulate
+        :param rand_uniforms: np.ndarray[float]: one uniform draw in [0, 1) per document
+        :param skip_state: tuple: doc_confidence, doc_version and cluster_version arrays,
+                                  as described in _gibbs_sweep
+        :return: int
+            number of documents transferred to a different cluster
+        """
+        m_z, n_z = self.cluster_doc_count, self.cluster_word_count
+        doc_confidence, doc_version, cluster_version = skip_state
+        skip_threshold = self._skip_threshold()
+        total_transfers = 0
+
+        for i in range(len(d_z)):
+            z_old = d_z[i]
+
+            # keep the doc where it is if it was confidently placed and its cluster
+            # has not changed since
+            if (
+                doc_confidence[i] >= skip_threshold
+                and doc_version[i] == cluster_version[z_old]
+            ):
+                continue
+
+            start, end = doc_offsets[i], doc_offsets[i + 1]
+            ids = docs_flat[start:end]
+
+            # remove the doc from it's current cluster totals. Its token counts are
+            # gathered for every cluster in one (K, doc_size) read and the doc's own
+            # contribution is taken out of that copy, so n_z_w is only written to
+            # when the doc actually moves.
+            m_z[z_old] -= 1
+            n_z[z_old] -= len(ids)
+            counts = n_z_w[:, ids]
+            counts[z_old] -= token_mult[start:end]
+
+            # draw sample from distribution to find new cluster
+            p = self._score_counts(counts, log_denom_cum)
+            z_new = self._sample(p, rand_uniforms[i])
+
+            m_z[z_new] += 1
+            n_z[z_new] += len(ids)
+
+            # transfer doc to the new cluster; only a transfer changes cluster contents
+            if z_new != z_old:
+                total_transfers += 1
+                cluster_version[z_old] += 1
+                cluster_version[z_new] += 1
+
+                d_z[i] = z_new
+                if repeated_tokens:
+                    np.add.at(n_z_w[z_old], ids, -1)
+                    np.add.at(n_z_w[z_new], ids, 1)
+                else:
+                    n_z_w[z_old, ids] -= 1
+                    n_z_w[z_new, ids] += 1
+            if self.skip_threshold is not None:
+                doc_confidence[i] = float(p[z_new])
+            doc_version[i] = cluster_version[z_new]
+
+        return total_transfers
+
+    def _block_sweep(
+        self,
+        d_z,
+        docs_flat,
+        doc_offsets,
+        token_mult,
+        n_z_w,
+        log_denom_cum,
+        rand_uniforms,
+        skip_state,
+    ):  # pylint: disable=too-many-arguments,too-many-locals
+        """
+        Run one Gibbs sampling pass on the GPU. Documents are taken in blocks of
+        _GPU_BLOCK_SIZE: every doc in a block is scored against the counts as they
+        stood at the start of the block, then all transfers of the block are applied
+        at once (AD-LDA style block synchronization). A block costs a fixed number
+        of kernel launches and one device to host sync, independent of its size.
+        With a block size of 1 this is exactly the sequential sampler.
+        :param d_z: cupy.ndarray[int32]: cluster label of each document, updated in place
+        :param docs_flat: cupy.ndarray[int32]: token ids of all documents, concatenated
+        :param doc_offsets: np.ndarray[int64]: host copy of the doc offsets; doc i spans
+                                               docs_flat[doc_offsets[i]:doc_offsets[i+1]]
+        :param token_mult: cupy.ndarray[int32]: multiplicity of each docs_flat entry in its doc
+        :param n_z_w: cupy.ndarray[int32]: (K, V) cluster word counts, updated in place
+        :param log_denom_cum: cupy.ndarray[float]: prefix sums of log(V*beta + j)
+        :param rand_uniforms: cupy.ndarray[float]: one uniform draw in [0, 1) per document
+        :param skip_state: tuple: doc_confidence, doc_version and cluster_version arrays,
+                                  as described in _gibbs_sweep
+        :return: int
+            number of documents transferred to a different cluster
+        """
+        m_z, n_z = self.cluster_doc_count, self.cluster_word_count
+        doc_confidence, doc_version, cluster_version = skip_state
+        skip_threshold = self._skip_threshold()
+        xp = _array_module(n_z_w)
+        K, V = n_z_w.shape  # pylint: disable=invalid-name
+        n_z_w_flat = n_z_w.reshape(-1)
+        clusters = xp.arange(K)[:, None]
+        total_transfers = 0
+
+        for start in range(0, len(d_z), _GPU_BLOCK_SIZE):
+            stop = min(start + _GPU_BLOCK_SIZE, len(d_z))
+            tok_start, tok_stop = doc_offsets[start], doc_offsets[stop]
+            host_sizes = np.diff(doc_offsets[start : stop + 1])
+            block_offsets = xp.asarray(doc_offsets[start : stop + 1] - tok_start)
+            sizes = xp.asarray(host_sizes)
+            token_doc = xp.asarray(np.repeat(np.arange(stop - start), host_sizes))
+            tokens = docs_flat[tok_start:tok_stop]
+            token_index = xp.arange(len(tokens))
+            z_old = d_z[start:stop]
+            token_z_old = z_old[token_doc].astype(xp.int64)
+
+            # keep docs where they are if they were confidently placed and their
+            # cluster has not changed since
+            active = ~(
+                (doc_confidence[start:stop] >= skip_threshold)
+                & (doc_version[start:stop] == cluster_version[z_old])
+            )
+
+            # gather the block's token counts in every cluster and take each doc's
+            # own contribution out of its current cluster, as the sequential sweeps do
+            counts = n_z_w[:, tokens].astype(xp.float64)
+            counts[token_z_old, token_index] -= token_mult[tok_start:tok_stop]
+            own = clusters == z_old[None, :]
+
+            # lN2 per (cluster, doc) as differences of a running sum over the tokens
+            log_counts = xp.zeros((K, len(tokens) + 1))
+            log_counts[:, 1:] = xp.cumsum(xp.log(counts + self.beta), axis=1)
+            lN2 = log_counts[:, block_offsets[1:]] - log_counts[:, block_offsets[:-1]]
+            m = m_z[:, None] - own
+            n = n_z[:, None] - own * sizes[None, :]
+            lD2 = log_denom_cum[n + sizes[None, :]] - log_denom_cum[n]
+            lp = xp.log(m + self.alpha) + lN2 - lD2
+
+            # draw every doc's new cluster by inverting its cumulative distribution
+            p = xp.exp(lp - lp.max(axis=0))
+            cumulative = xp.cumsum(p, axis=0)
+            thresholds = rand_uniforms[start:stop] * cumulative[-1]
+            z_new = xp.minimum((cumulative <= thresholds).sum(axis=0), K - 1)
+            z_new = xp.where(active, z_new, z_old).astype(d_z.dtype)
+
+            # apply all transfers of the block at once
+            moved = z_new != z_old
+            n_moved = int(moved.sum())
+            if n_moved:
+                z_from, z_to = z_old[moved], z_new[moved]
+                m_z += xp.bincount(z_to, minlength=K)
+                m_z -= xp.bincount(z_from, minlength=K)
+                n_z += (
+                    xp.bincount(z_to, weights=sizes[moved], minlength=K)
+                    - xp.bincount(z_from, weights=sizes[moved], minlength=K)
+                ).astype(n_z.dtype)
+                cluster_version += xp.bincount(z_to, minlength=K)
+                cluster_version += xp.bincount(z_from, minlength=K)
+
+                token_moved = moved[token_doc]
+                moved_tokens = tokens[token_moved]
+                token_z_new = z_new[token_doc].astype(xp.int64)
+                xp.add.at(n_z_w_flat, token_z_old[token_moved] * V + moved_tokens, -1)
+                xp.add.at(n_z_w_flat, token_z_new[token_moved] * V + moved_tokens, 1)
+                d_z[start:stop] = z_new
+                total_transfers += n_moved
+
+            confidence = p[z_new, xp.arange(stop - start)] / cumulative[-1]
+            doc_confidence[start:stop] = xp.where(
+                active, confidence, doc_confidence[start:stop]
+            )
+            doc_version[start:stop] = xp.where(
+                active, cluster_version[z_new], doc_version[start:stop]
+            )
+
+        return total_transfers
+
+    def _skip_threshold(self):
+        """
+        The skip_threshold to compare document confidences against, np.inf when
+        every document must be resampled
+        """
+        return np.inf if self.skip_threshold is None else self.skip_threshold
+
+    def score(self, doc):
         """
         Score a document
 
@@ -205,48 +694,55 @@ class MovieGroupProcess:
         http://dbgroup.cs.tsinghua.edu.cn/wangjy/papers/KDD14-GSDMM.pdf
 
         :param doc: list[str]: The doc token stream
-        :return: list[float]: A length K probability vector where each component represents
+        :return: np.ndarray[float]: A length K probability vector where each component represents
                               the probability of the document appearing in a particular cluster
         """
-        # pylint: disable=invalid-name
-        alpha, beta, K, V, D = (
-            self.alpha,
-            self.beta,
-            self.K,
-            self.vocab_size,
-            self.number_docs,
-        )
-        m_z, n_z, n_z_w = (
-            self.cluster_doc_count,
-            self.cluster_word_count,
-            self.cluster_word_distribution,
-        )
+        # stack the per-cluster counts of the doc's tokens so each term of the
+        # formula is a single array operation
+        counts = np.empty((self.K, len(doc)))
+        for label, word_counts in enumerate(self.cluster_word_distribution):
+            counts[label] = [word_counts.get(word, 0) for word in doc]
+        return self._score_counts(counts)
+
+    def _score_counts(self, counts, log_denom_cum=None):
+        """
+        Score a document from the counts its tokens have in each cluster
 
-        p = [0 for _ in range(K)]
+        :param counts: np.ndarray: A (K, doc_size) matrix, entry [z, i] being the number of
+                                   times the i-th token of the doc occurs in cluster z
+        :param log_denom_cum: np.ndarray[float]: optional table from _log_denom_cum covering
+                                                 the current cluster word counts
+        :return: np.ndarray[float]: A length K probability vector
+        """
+        # pylint: disable=invalid-name
+        alpha, beta, V = self.alpha, self.beta, self.vocab_size
+        m_z, n_z = self.cluster_doc_count, self.cluster_word_count
 
         #  We break the formula into the following pieces
         #  p = N1*N2/(D1*D2) = exp(lN1 - lD1 + lN2 - lD2)
         #  lN1 = log(m_z[z] + alpha)
-        #  lN2 = log(D - 1 + K*alpha)
+        #  lD1 = log(D - 1 + K*alpha)
         #  lN2 = log(product(n_z_w[w] + beta)) = sum(log(n_z_w[w] + beta))
         #  lD2 = log(product(n_z[d] + V*beta + i -1)) = sum(log(n_z[d] + V*beta + i -1))
+        #      = lgamma(n_z[d] + V*beta + doc_size) - lgamma(n_z[d] + V*beta)
+        #  Each piece is computed for all K clusters at once. D1 is the same for every
+        #  cluster and cancels when p is normalized, so it is never computed.
+
+        doc_size = counts.shape[1]
+        lN1 = np.log(np.asarray(m_z, dtype=np.float64) + alpha)
+        lN2 = np.log(counts + beta).sum(axis=1)
+        if log_denom_cum is not None:
+            lD2 = log_denom_cum[n_z + doc_size] - log_denom_cum[n_z]
+        else:
+            offsets = (np.asarray(n_z) + V * beta).tolist()
+            lD2 = np.array(
+                [math.lgamma(n + doc_size) - math.lgamma(n) for n in offsets]
+            )
+        lp = lN1 + lN2 - lD2
 
-        lD1 = log(D - 1 + K * alpha)
-        doc_size = len(doc)
-        for label in range(K):
-            lN1 = log(m_z[label] + alpha)
-            lN2 = 0
-            lD2 = 0
-            for word in doc:
-                lN2 += log(n_z_w[label].get(word, 0) + beta)
-            for j in range(1, doc_size + 1):
-                lD2 += log(n_z[label] + V * beta + j - 1)
-            p[label] = exp(lN1 - lD1 + lN2 - lD2)
-
-        # normalize the probability vector
-        pnorm = sum(p)
-        pnorm = pnorm if pnorm > 0 else 1
-        return [pp / pnorm for pp in p]
+        # normalize the probability vector, shifting by the max to avoid underflow
+        p = np.exp(lp - lp.max())
+        return p / p.sum()
 
     def choose_best_label(self, doc):
         """
@@ -255,19 +751,19 @@ class MovieGroupProcess:
         :return:
         """
         p = self.score(doc)
-        return argmax(p), max(p)
+        return np.argmax(p), np.max(p)
 
     def get_top_words(self, k_words: int = 5, merge_token: str = " ") -> TopicWords:
         """
         Filter the top k_words entries per cluster using merge_token as a separator.
         """
-        doc_count = np_array(self.cluster_doc_count)
+        doc_count = np.asarray(self.cluster_doc_count)
         top_index = doc_count.argsort()[-self.K :][::-1]
         topic_words: TopicWords = {}
 
         for cluster in top_index:
             items = self.cluster_word_distribution[cluster].items()
-            sort_dicts = sorted(items, key=lambda k: k[1], reverse=True)[:k_words]
+            sort_dicts = heapq.nlargest(k_words, items, key=lambda k: k[1])
             words = merge_token.join([wc[0] for wc in sort_dicts])
             topic_words[int(cluster)] = words
 
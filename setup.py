@@ -14,5 +14,6 @@ setup(
     author_email='ryan@ryanwalker.us',
     description='GSDMM: Short text clustering ',
     license='MIT',
-    install_requires=INSTALL_REQUIRES
+    install_requires=INSTALL_REQUIRES,
+    extras_require={'numba': ['numba'], 'gpu': ['cupy']}
 )
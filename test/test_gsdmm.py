@@ -1,15 +1,19 @@
-from unittest import TestCase
+from types import SimpleNamespace
+from unittest import TestCase, mock, skipUnless
+from gsdmm import mgp as mgp_module
 from gsdmm.mgp import MovieGroupProcess
 import numpy
 
-class TestGSDMM(TestCase):
-    '''This class tests the Panel data structures needed to support the RSK model'''
+# stands in for cupy so the GPU code path runs on numpy arrays
+fake_cupy = SimpleNamespace(
+    get_array_module=lambda arr: numpy,
+    asarray=numpy.array,
+    asnumpy=numpy.asarray,
+)
 
-    def setUp(self):
-        numpy.random.seed(47)
 
-    def tearDown(self):
-        numpy.random.seed(None)
+class TestGSDMM(TestCase):
+    '''This class tests the Panel data structures needed to support the RSK model'''
 
     def compute_V(self, texts):
         V = set()
@@ -47,7 +51,7 @@ class TestGSDMM(TestCase):
         ]))
 
         grades = grades + grades + grades + grades + grades
-        mgp = MovieGroupProcess(K=100, n_iters=100, alpha=0.001, beta=0.01)
+        mgp = MovieGroupProcess(K=100, n_iters=100, alpha=0.001, beta=0.01, random_state=17)
         y = mgp.fit(grades, self.compute_V(grades))
         self.assertEqual(len(set(y)), 7)
         for words in mgp.cluster_word_distribution:
@@ -68,7 +72,7 @@ class TestGSDMM(TestCase):
         'conversion',
         'alm']]
 
-        mgp = MovieGroupProcess(K=10, alpha=0.1, beta=0.1, n_iters=30)
+        mgp = MovieGroupProcess(K=10, alpha=0.1, beta=0.1, n_iters=30, random_state=47)
 
         vocab = set(x for doc in docs for x in doc)
         n_terms = len(vocab)
@@ -96,7 +100,152 @@ class TestGSDMM(TestCase):
 
         texts = [text.split() for text in texts]
         V = self.compute_V(texts)
-        mgp = MovieGroupProcess(K=30, n_iters=100, alpha=0.2, beta=0.01)
+        mgp = MovieGroupProcess(K=30, n_iters=100, alpha=0.2, beta=0.01, random_state=47)
         y = mgp.fit(texts, V)
         self.assertTrue(len(set(y))<10)
         self.assertTrue(len(set(y))>3)
+
+        # empty entries are dropped once when the counts are decoded after fitting
+        for words in mgp.cluster_word_distribution:
+            self.assertTrue(all(count > 0 for count in words.values()))
+
+    @skipUnless(mgp_module._HAS_NUMBA, "numba is not installed")
+    def test_numba_sweep_matches_numpy(self):
+        texts = [
+            "where the red dog lives",
+            "red dog lives in the house",
+            "blue cat eats mice",
+            "monkeys hate cat but love trees",
+            "green cat eats mice",
+            "orange elephant never forgets",
+            "monkeys eat banana",
+            "the dog chased the cat",
+        ]
+        texts = [text.split() for text in texts]
+        V = self.compute_V(texts)
+
+        for skip_threshold in (None, 0.9):
+            labels = []
+            for has_numba in (True, False):
+                with mock.patch("gsdmm.mgp._HAS_NUMBA", has_numba):
+                    mgp = MovieGroupProcess(K=10, n_iters=20, alpha=0.2, beta=0.01, random_state=47,
+                                            skip_threshold=skip_threshold)
+                    labels.append(mgp.fit(texts, V))
+            numpy.testing.assert_array_equal(labels[0], labels[1])
+
+    @skipUnless(mgp_module._HAS_NUMBA, "numba is not installed")
+    def test_parallel_counts_match_labels(self):
+        texts = [text.split() for text in [
+            "where the red dog lives",
+            "red dog lives in the house",
+            "blue cat eats mice",
+            "green cat eats mice",
+            "orange elephant never forgets",
+            "monkeys eat banana",
+        ]] * 20
+        mgp = MovieGroupProcess(K=10, n_iters=10, alpha=0.1, beta=0.1, random_state=47, parallel=True)
+        y = mgp.fit(texts, self.compute_V(texts))
+
+        self.assertEqual(list(mgp.cluster_doc_count), [numpy.sum(y == z) for z in range(10)])
+        for z, words in enumerate(mgp.cluster_word_distribution):
+            cluster_texts = [text for text, label in zip(texts, y) if label == z]
+            self.assertEqual(mgp.cluster_word_count[z], sum(map(len, cluster_texts)))
+            self.assertEqual(sum(words.values()), mgp.cluster_word_count[z])
+
+    def test_get_top_words(self):
+        mgp = MovieGroupProcess.from_data(
+            K=3,
+            alpha=0.1,
+            beta=0.1,
+            D=6,
+            vocab_size=5,
+            cluster_doc_count=[3, 0, 3],
+            cluster_word_count=[6, 0, 4],
+            cluster_word_distribution=[
+                {"cat": 1, "dog": 3, "mice": 2},
+                {},
+                {"tree": 3, "monkey": 1},
+            ],
+        )
+        self.assertEqual(
+            mgp.get_top_words(k_words=2),
+            {0: "dog mice", 2: "tree monkey", 1: ""},
+        )
+
+    @skipUnless(mgp_module.cupy is None, "cupy is installed")
+    def test_use_gpu_requires_cupy(self):
+        with self.assertRaises(ImportError):
+            MovieGroupProcess(use_gpu=True)
+
+    def test_gpu_block_sweep_of_one_matches_numpy(self):
+        texts = [text.split() for text in [
+            "where the red dog lives",
+            "red dog lives in the house",
+            "blue cat eats mice",
+            "monkeys hate cat but love trees",
+            "green cat eats mice",
+            "the dog chased the cat",
+        ]]
+        V = self.compute_V(texts)
+
+        for skip_threshold in (None, 0.9):
+            with mock.patch("gsdmm.mgp._HAS_NUMBA", False):
+                expected = MovieGroupProcess(K=10, n_iters=20, alpha=0.2, beta=0.01, random_state=47,
+                                             skip_threshold=skip_threshold).fit(texts, V)
+            with mock.patch("gsdmm.mgp.cupy", fake_cupy), mock.patch("gsdmm.mgp._GPU_BLOCK_SIZE", 1):
+                mgp = MovieGroupProcess(K=10, n_iters=20, alpha=0.2, beta=0.01, random_state=47,
+                                        skip_threshold=skip_threshold, use_gpu=True)
+                labels = mgp.fit(texts, V)
+            numpy.testing.assert_array_equal(labels, expected)
+
+    def test_gpu_block_sweep_counts_match_labels(self):
+        texts = [text.split() for text in [
+            "where the red dog lives",
+            "red dog lives in the house",
+            "blue cat eats mice",
+            "green cat eats mice",
+            "orange elephant never forgets",
+            "the dog chased the cat",
+        ]] * 20
+        with mock.patch("gsdmm.mgp.cupy", fake_cupy), mock.patch("gsdmm.mgp._GPU_BLOCK_SIZE", 16):
+            mgp = MovieGroupProcess(K=10, n_iters=10, alpha=0.1, beta=0.1, random_state=47, use_gpu=True)
+            y = mgp.fit(texts, self.compute_V(texts))
+
+        self.assertEqual(list(mgp.cluster_doc_count), [numpy.sum(y == z) for z in range(10)])
+        for z, words in enumerate(mgp.cluster_word_distribution):
+            cluster_texts = [text for text, label in zip(texts, y) if label == z]
+            self.assertEqual(mgp.cluster_word_count[z], sum(map(len, cluster_texts)))
+            expected = {}
+            for text in cluster_texts:
+                for word in text:
+                    expected[word] = expected.get(word, 0) + 1
+            self.assertEqual(words, expected)
+
+    def test_skip_threshold_skips_scoring(self):
+        texts = [text.split() for text in [
+            "where the red dog lives",
+            "red dog lives in the house",
+            "blue cat eats mice",
+            "green cat eats mice",
+            "orange elephant never forgets",
+            "orange elephant must forget",
+        ]]
+        V = self.compute_V(texts)
+
+        calls = []
+        for skip_threshold in (None, 0.9):
+            with mock.patch("gsdmm.mgp._HAS_NUMBA", False), mock.patch.object(
+                MovieGroupProcess, "_score_counts", autospec=True,
+                side_effect=MovieGroupProcess._score_counts,
+            ) as score_counts:
+                mgp = MovieGroupProcess(K=10, n_iters=20, alpha=0.2, beta=0.01, random_state=47,
+                                        skip_threshold=skip_threshold)
+                mgp.fit(texts, V)
+            calls.append(score_counts.call_count)
+        self.assertLess(calls[1], calls[0])
+
+    def test_skip_threshold_must_be_a_probability(self):
+        for skip_threshold in (0, -0.5, 1.5):
+            with self.assertRaises(ValueError):
+                MovieGroupProcess(skip_threshold=skip_threshold)
+        MovieGroupProcess(skip_threshold=1)